@@ -5,13 +5,28 @@
 """
 
 import os
+import io
 import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path
+import numpy as np
 from PIL import Image
 import matplotlib.pyplot as plt
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 class CompressionAnalyzer:
-    def __init__(self):
+    def __init__(self, encode_threads=None):
         self.results = []
+        # Число потоков для параллельного кодирования вариантов одного изображения
+        self.encode_threads = encode_threads or os.cpu_count() or 1
+        # Те же результаты в виде параллельных массивов (формат, размер) для агрегации
+        self._format_names = []
+        self._sizes = []
         
     def analyze_image_compression(self, image_path, output_dir="compression_analysis"):
         """Анализ сжатия одного изображения в разных форматах"""
@@ -21,13 +36,25 @@ class CompressionAnalyzer:
             
         os.makedirs(output_dir, exist_ok=True)
         
+        analysis = self._build_analysis(image_path, output_dir)
+        self._add_result(analysis)
+        
+        return analysis
+    
+    @staticmethod
+    def _analyze_group(image_paths, output_dir="compression_analysis", encode_threads=None):
+        """Анализ группы изображений с одинаковым именем в отдельном процессе"""
+        analyzer = CompressionAnalyzer(encode_threads)
+        return [analyzer._build_analysis(image_path, output_dir) for image_path in image_paths]
+    
+    def _build_analysis(self, image_path, output_dir):
+        """Создание всех вариантов сжатия изображения без вывода результатов"""
         # Загружаем исходное изображение
         img = Image.open(image_path)
+        # Декодируем заранее: изображение сохраняется сразу из нескольких потоков
+        img.load()
         base_name = os.path.splitext(os.path.basename(image_path))[0]
         
-        print(f"\nАнализ изображения: {base_name}")
-        print(f"Исходный размер: {img.size[0]}x{img.size[1]} пикселей")
-        
         analysis = {
             'filename': base_name,
             'original_size': img.size,
@@ -50,63 +77,96 @@ class CompressionAnalyzer:
         webp_files = self._create_webp_variants(img, base_name, output_dir)
         analysis['formats']['WebP'] = webp_files
         
+        return analysis
+    
+    def _add_result(self, analysis):
+        """Сохранение результата анализа и вывод сводки"""
+        width, height = analysis['original_size']
+        print(f"\nАнализ изображения: {analysis['filename']}")
+        print(f"Исходный размер: {width}x{height} пикселей")
+        
         self.results.append(analysis)
+        for format_name, variants in analysis['formats'].items():
+            # BMP хранится одним вариантом, остальные форматы - словарем вариантов
+            entries = [variants] if 'size' in variants else variants.values()
+            for variant_data in entries:
+                self._format_names.append(format_name)
+                self._sizes.append(variant_data['size'])
+        
         self._print_analysis_summary(analysis)
+    
+    def _save_variants(self, tasks):
+        """Параллельное сохранение вариантов изображения
+        
+        tasks - список кортежей (вариант, изображение, файл, формат, параметры, описание).
+        Кодировщики PIL отпускают GIL, поэтому потоки дают реальное ускорение.
+        Каждый вариант кодируется в буфер в памяти: размер берется из буфера,
+        а на диск файл записывается одной операцией.
+        
+        Image.save сохраняет параметры кодирования в самом изображении, поэтому
+        одновременные сохранения одного объекта подхватывают чужие параметры.
+        Каждая задача получает собственную копию изображения.
+        """
+        def encode(image, fmt, params):
+            buffer = io.BytesIO()
+            image.save(buffer, fmt, **params)
+            return buffer.getvalue()
+        
+        with ThreadPoolExecutor(max_workers=min(len(tasks), self.encode_threads)) as executor:
+            futures = [executor.submit(encode, image.copy(), fmt, params)
+                       for _, image, _, fmt, params, _ in tasks]
+            encoded = [future.result() for future in futures]
         
-        return analysis
+        variants = {}
+        for (variant_name, _, filename, _, _, description), data in zip(tasks, encoded):
+            Path(filename).write_bytes(data)
+            variants[variant_name] = {
+                'filename': filename,
+                'size': len(data),
+                'description': description
+            }
+        
+        return variants
     
     def _create_png_variants(self, img, base_name, output_dir):
         """Создание PNG файлов с разными настройками"""
-        variants = {}
-        
-        # PNG без оптимизации
-        filename = os.path.join(output_dir, f"{base_name}_png_standard.png")
-        img.save(filename, 'PNG')
-        variants['standard'] = {
-            'filename': filename,
-            'size': os.path.getsize(filename),
-            'description': 'Стандартный PNG'
-        }
-        
-        # PNG с оптимизацией
-        filename = os.path.join(output_dir, f"{base_name}_png_optimized.png")
-        img.save(filename, 'PNG', optimize=True)
-        variants['optimized'] = {
-            'filename': filename,
-            'size': os.path.getsize(filename),
-            'description': 'Оптимизированный PNG'
-        }
+        tasks = [
+            # PNG без оптимизации (уровень zlib по умолчанию)
+            ('standard', img, os.path.join(output_dir, f"{base_name}_png_standard.png"),
+             'PNG', {'compress_level': 6}, 'Стандартный PNG'),
+            # PNG с оптимизацией
+            ('optimized', img, os.path.join(output_dir, f"{base_name}_png_optimized.png"),
+             'PNG', {'optimize': True}, 'Оптимизированный PNG'),
+        ]
         
         # PNG с палитрой (для изображений с ограниченным количеством цветов)
         if img.mode in ['RGB', 'RGBA']:
-            filename = os.path.join(output_dir, f"{base_name}_png_palette.png")
             # Конвертируем в палитровый режим
             palette_img = img.convert('P', palette=Image.ADAPTIVE, colors=256)
-            palette_img.save(filename, 'PNG', optimize=True)
-            variants['palette'] = {
-                'filename': filename,
-                'size': os.path.getsize(filename),
-                'description': 'PNG с палитрой'
-            }
+            tasks.append(('palette', palette_img,
+                          os.path.join(output_dir, f"{base_name}_png_palette.png"),
+                          'PNG', {'optimize': True}, 'PNG с палитрой'))
         
-        return variants
+        return self._save_variants(tasks)
     
     def _create_jpeg_variants(self, img, base_name, output_dir):
         """Создание JPEG файлов с разными уровнями качества"""
-        variants = {}
-        
         quality_levels = [100, 95, 85, 75, 50, 25]
         
-        for quality in quality_levels:
-            filename = os.path.join(output_dir, f"{base_name}_jpeg_q{quality}.jpg")
-            img.save(filename, 'JPEG', quality=quality, optimize=True)
-            variants[f'q{quality}'] = {
-                'filename': filename,
-                'size': os.path.getsize(filename),
-                'description': f'JPEG качество {quality}%'
-            }
+        # Переводим RGB в YCbCr один раз, а не в каждом из шести кодирований.
+        # Общее изображение не сохраняется из разных потоков напрямую:
+        # _save_variants кодирует собственную копию для каждого уровня качества.
+        # Преобразование Pillow округляет иначе, чем libjpeg, поэтому
+        # размеры файлов немного отличаются от кодирования из RGB
+        jpeg_img = img.convert('YCbCr') if img.mode == 'RGB' else img
         
-        return variants
+        tasks = [
+            (f'q{quality}', jpeg_img, os.path.join(output_dir, f"{base_name}_jpeg_q{quality}.jpg"),
+             'JPEG', {'quality': quality, 'optimize': True}, f'JPEG качество {quality}%')
+            for quality in quality_levels
+        ]
+        
+        return self._save_variants(tasks)
     
     def _create_bmp_variant(self, img, base_name, output_dir):
         """Создание BMP файла"""
@@ -121,27 +181,17 @@ class CompressionAnalyzer:
     
     def _create_webp_variants(self, img, base_name, output_dir):
         """Создание WebP файлов с разными настройками"""
-        variants = {}
-        
-        try:
+        tasks = [
             # WebP без потерь
-            filename = os.path.join(output_dir, f"{base_name}_webp_lossless.webp")
-            img.save(filename, 'WebP', lossless=True)
-            variants['lossless'] = {
-                'filename': filename,
-                'size': os.path.getsize(filename),
-                'description': 'WebP без потерь'
-            }
-            
+            ('lossless', img, os.path.join(output_dir, f"{base_name}_webp_lossless.webp"),
+             'WebP', {'lossless': True}, 'WebP без потерь'),
             # WebP с потерями
-            filename = os.path.join(output_dir, f"{base_name}_webp_lossy.webp")
-            img.save(filename, 'WebP', quality=80)
-            variants['lossy'] = {
-                'filename': filename,
-                'size': os.path.getsize(filename),
-                'description': 'WebP с потерями (80%)'
-            }
-            
+            ('lossy', img, os.path.join(output_dir, f"{base_name}_webp_lossy.webp"),
+             'WebP', {'quality': 80}, 'WebP с потерями (80%)'),
+        ]
+        
+        try:
+            variants = self._save_variants(tasks)
         except Exception as e:
             print(f"Ошибка создания WebP: {e}")
             variants = {}
@@ -158,7 +208,7 @@ class CompressionAnalyzer:
         all_variants = []
         
         for format_name, variants in analysis['formats'].items():
-            if isinstance(variants, dict):
+            if 'size' not in variants:
                 for variant_name, variant_data in variants.items():
                     all_variants.append((format_name, variant_name, variant_data))
             else:
@@ -193,22 +243,44 @@ class CompressionAnalyzer:
     
     def analyze_directory(self, directory="test_images"):
         """Анализ всех изображений в директории"""
-        if not os.path.exists(directory):
+        try:
+            with os.scandir(directory) as entries:
+                image_files = [entry.name for entry in entries
+                               if entry.is_file()
+                               and entry.name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))]
+        except FileNotFoundError:
             print(f"Директория {directory} не найдена!")
             return
         
-        image_files = [f for f in os.listdir(directory) 
-                      if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))]
-        
         if not image_files:
             print(f"В директории {directory} не найдено изображений!")
             return
         
         print(f"Найдено {len(image_files)} изображений для анализа")
         
+        output_dir = "compression_analysis"
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Файлы с одинаковым именем (например, .png и .jpg) пишут результаты
+        # в одни и те же файлы, поэтому они обрабатываются в одном процессе
+        groups = {}
         for image_file in image_files:
-            image_path = os.path.join(directory, image_file)
-            self.analyze_image_compression(image_path)
+            base_name = os.path.splitext(image_file)[0]
+            groups.setdefault(base_name, []).append(os.path.join(directory, image_file))
+        
+        # Группы обрабатываются независимо, поэтому раскладываем их по процессам.
+        # Ядра делятся между процессами и потоками кодирования внутри них,
+        # чтобы общее число потоков не превышало число ядер.
+        # Сводки выводятся в основном процессе в порядке групп
+        cpu_count = os.cpu_count() or 1
+        process_count = min(cpu_count, len(groups))
+        encode_threads = max(1, cpu_count // process_count)
+        with ProcessPoolExecutor(max_workers=process_count) as executor:
+            for analyses in executor.map(self._analyze_group, groups.values(),
+                                         repeat(output_dir), repeat(encode_threads),
+                                         chunksize=1):
+                for analysis in analyses:
+                    self._add_result(analysis)
         
         # Создание итогового отчета
         self.create_summary_report()
@@ -222,33 +294,32 @@ class CompressionAnalyzer:
         print("ИТОГОВЫЙ ОТЧЕТ ПО АНАЛИЗУ СЖАТИЯ")
         print(f"{'='*80}")
         
-        # Статистика по форматам
-        format_stats = {}
-        
-        for result in self.results:
-            for format_name, variants in result['formats'].items():
-                if format_name not in format_stats:
-                    format_stats[format_name] = {'total_size': 0, 'count': 0}
-                
-                if isinstance(variants, dict):
-                    for variant_data in variants.values():
-                        format_stats[format_name]['total_size'] += variant_data['size']
-                        format_stats[format_name]['count'] += 1
-                else:
-                    format_stats[format_name]['total_size'] += variants['size']
-                    format_stats[format_name]['count'] += 1
+        # Статистика по форматам: группировка параллельных массивов средствами NumPy
+        names = np.array(self._format_names)
+        sizes = np.array(self._sizes, dtype=np.int64)
+        format_names, first_index, inverse = np.unique(names, return_index=True,
+                                                       return_inverse=True)
+        total_sizes = np.bincount(inverse, weights=sizes)
+        counts = np.bincount(inverse)
         
         print(f"\nСТАТИСТИКА ПО ФОРМАТАМ:")
         print(f"{'Формат':<12} {'Средний размер':<15} {'Количество':<12}")
         print("-" * 40)
         
-        for format_name, stats in format_stats.items():
-            avg_size = stats['total_size'] / stats['count']
-            print(f"{format_name:<12} {avg_size:<15.0f} {stats['count']:<12}")
+        # Форматы выводятся в порядке первого появления
+        for k in np.argsort(first_index):
+            avg_size = total_sizes[k] / counts[k]
+            print(f"{format_names[k]:<12} {avg_size:<15.0f} {counts[k]:<12}")
         
         # Сохранение результатов в JSON
-        with open('compression_analysis_results.json', 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, ensure_ascii=False, indent=2)
+        # orjson (если установлен) сериализует заметно быстрее и сразу пишет UTF-8
+        if orjson is not None:
+            data = orjson.dumps(self.results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            with open('compression_analysis_results.json', 'wb') as f:
+                f.write(data)
+        else:
+            with open('compression_analysis_results.json', 'w', encoding='utf-8') as f:
+                json.dump(self.results, f, ensure_ascii=False, indent=2)
         
         print(f"\nДетальные результаты сохранены в: compression_analysis_results.json")
 
@@ -4,7 +4,8 @@
 Создает различные типы изображений для изучения структуры файлов
 """
 
-from PIL import Image, ImageDraw
+from PIL import Image
+import numpy as np
 import os
 import struct
 
@@ -16,12 +17,10 @@ def create_minimal_png():
 
 def create_gradient_image():
     """Создание градиентного изображения 10x10"""
-    img = Image.new('RGB', (10, 10))
-    for x in range(10):
-        for y in range(10):
-            # Создаем градиент от черного к белому
-            intensity = int(255 * (x + y) / 18)
-            img.putpixel((x, y), (intensity, intensity, intensity))
+    # Создаем градиент от черного к белому: intensity = 255 * (x + y) / 18
+    gray = (np.add.outer(np.arange(10), np.arange(10)) * 255 // 18).astype(np.uint8)
+    rgb = np.repeat(gray[:, :, None], 3, axis=2)
+    img = Image.fromarray(rgb, 'RGB')
     
     img.save('test_gradient_10x10.png', 'PNG', optimize=True)
     img.save('test_gradient_10x10.jpg', 'JPEG', quality=95)
@@ -30,14 +29,15 @@ def create_gradient_image():
 
 def create_colorful_image():
     """Создание цветного изображения 50x50 с узором"""
-    img = Image.new('RGB', (50, 50))
-    for x in range(50):
-        for y in range(50):
-            # Создаем цветной узор
-            r = (x * 5) % 256
-            g = (y * 5) % 256
-            b = ((x + y) * 3) % 256
-            img.putpixel((x, y), (r, g, b))
+    # Создаем цветной узор (строки массива - y, столбцы - x).
+    # Значения неотрицательные, поэтому % 256 заменяется на & 0xFF
+    x = np.arange(50, dtype=np.int16)[None, :]
+    y = np.arange(50, dtype=np.int16)[:, None]
+    r = ((x * 5) & 0xFF).astype(np.uint8)
+    g = ((y * 5) & 0xFF).astype(np.uint8)
+    b = (((x + y) * 3) & 0xFF).astype(np.uint8)
+    rgb = np.stack([np.broadcast_to(r, (50, 50)), np.broadcast_to(g, (50, 50)), b], axis=-1)
+    img = Image.fromarray(rgb, 'RGB')
     
     img.save('test_colorful_50x50.png', 'PNG', optimize=True)
     img.save('test_colorful_50x50.jpg', 'JPEG', quality=85)
@@ -46,40 +46,46 @@ def create_colorful_image():
 
 def create_geometric_pattern():
     """Создание геометрического узора для анализа сжатия"""
-    img = Image.new('RGB', (100, 100), (255, 255, 255))
-    draw = ImageDraw.Draw(img)
+    arr = np.full((100, 100, 3), 255, np.uint8)
     
-    # Рисуем геометрические фигуры
+    # Маска контура окружности 7x7 (центр в (3, 3), радиус 3), считается один раз
+    yy, xx = np.mgrid[0:7, 0:7]
+    dist2 = (xx - 3) ** 2 + (yy - 3) ** 2
+    ring = (dist2 >= 2.5 ** 2) & (dist2 < 3.5 ** 2)
+    
+    # Рисуем геометрические фигуры: квадрат 9x9 и вписанную в него окружность
     for i in range(0, 100, 10):
-        color = (i, 255-i, 128)
-        draw.rectangle([i, i, i+8, i+8], fill=color)
-        draw.ellipse([i+1, i+1, i+7, i+7], outline=(0, 0, 0))
+        arr[i:i+9, i:i+9] = (i, 255-i, 128)
+        arr[i+1:i+8, i+1:i+8][ring] = 0
+    
+    # Одно изображение используется для всех трех форматов
+    img = Image.fromarray(arr, 'RGB')
     
     img.save('test_geometric_100x100.png', 'PNG', optimize=True)
     img.save('test_geometric_100x100.jpg', 'JPEG', quality=90)
     img.save('test_geometric_100x100.bmp', 'BMP')
     return ['test_geometric_100x100.png', 'test_geometric_100x100.jpg', 'test_geometric_100x100.bmp']
 
-def analyze_file_size(filename):
-    """Анализ размера файла"""
-    if os.path.exists(filename):
-        size = os.path.getsize(filename)
-        return size
-    return 0
+def collect_file_sizes(filenames, directory='.'):
+    """Сбор размеров существующих файлов за один проход по директории"""
+    wanted = set(filenames)
+    with os.scandir(directory) as entries:
+        # stat вызывается только для запрошенных файлов
+        sizes = {entry.name: entry.stat().st_size for entry in entries
+                 if entry.name in wanted and entry.is_file()}
+    return [(filename, sizes[filename]) for filename in filenames if filename in sizes]
 
-def print_file_analysis(filenames):
-    """Вывод анализа размеров файлов"""
+def print_file_analysis(file_sizes):
+    """Вывод анализа размеров файлов (список пар имя файла - размер)"""
     print("\n=== АНАЛИЗ РАЗМЕРОВ ФАЙЛОВ ===")
     print(f"{'Файл':<30} {'Размер (байт)':<15} {'Формат':<10}")
     print("-" * 55)
     
     total_size = 0
-    for filename in filenames:
-        if os.path.exists(filename):
-            size = analyze_file_size(filename)
-            format_type = filename.split('.')[-1].upper()
-            print(f"{filename:<30} {size:<15} {format_type:<10}")
-            total_size += size
+    for filename, size in file_sizes:
+        format_type = filename.split('.')[-1].upper()
+        print(f"{filename:<30} {size:<15} {format_type:<10}")
+        total_size += size
     
     print("-" * 55)
     print(f"{'ИТОГО:':<30} {total_size:<15}")
@@ -115,7 +121,7 @@ def create_all_test_images():
     all_files.extend(geometric_files)
     
     # Анализ размеров
-    print_file_analysis(all_files)
+    print_file_analysis(collect_file_sizes(all_files))
     
     print(f"\nСоздано {len(all_files)} тестовых файлов в папке 'test_images/'")
     return all_files
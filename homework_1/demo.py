@@ -39,6 +39,7 @@ def main():
         if os.path.exists(demo_file):
             analyzer = HexAnalyzer(demo_file)
             analyzer.analyze_file()
+            analyzer.close()
             print("\n" + "-"*60 + "\n")
     
     print_section("3. АНАЛИЗ СЖАТИЯ ИЗОБРАЖЕНИЙ")
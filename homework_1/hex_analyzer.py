@@ -4,14 +4,23 @@ Hex-анализатор для изучения структуры изобра
 Анализирует PNG, JPEG, BMP файлы на байтовом уровне
 """
 
-import struct
+import mmap
+import sys
 import zlib
 import os
+import numpy as np
+
+# Таблица замены байтов для ASCII-колонки hex-дампа: непечатаемые -> '.'
+_ASCII_LUT = bytes(c if 32 <= c <= 126 else 0x2E for c in range(256))
+
+# JPEG маркеры без поля длины: TEM, RST0-RST7, SOI, EOI
+_JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8), 0xD8, 0xD9}
 
 class HexAnalyzer:
     def __init__(self, filename):
         self.filename = filename
         self.data = None
+        self.view = None
         self.file_size = 0
         
     def load_file(self):
@@ -19,15 +28,36 @@ class HexAnalyzer:
         if not os.path.exists(self.filename):
             print(f"Файл {self.filename} не найден!")
             return False
+        
+        # Повторная загрузка: освобождаем предыдущее отображение
+        self.close()
             
+        # Отображаем файл в память: ядро подгружает только реально читаемые страницы
         with open(self.filename, 'rb') as f:
-            self.data = f.read()
-            self.file_size = len(self.data)
-            
+            self.file_size = os.fstat(f.fileno()).st_size
+            if self.file_size > 0:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # Пустой файл отобразить нельзя
+                self.data = b''
+        
+        # Срезы memoryview не копируют данные
+        self.view = memoryview(self.data)
+        
         print(f"Загружен файл: {self.filename}")
         print(f"Размер файла: {self.file_size} байт")
         return True
     
+    def close(self):
+        """Освобождение отображения файла"""
+        # Отображение нельзя закрыть, пока на него ссылается memoryview
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = None
+    
     def print_hex_dump(self, start=0, length=64):
         """Вывод hex-дампа файла"""
         if not self.data:
@@ -37,27 +67,20 @@ class HexAnalyzer:
         end = min(start + length, len(self.data))
         print(f"\n=== HEX-ДАМП ({start:04X}-{end:04X}) ===")
         
+        # Строки дампа собираются в буфер и выводятся одной записью
+        lines = []
         for i in range(start, end, 16):
             # Адрес
             addr = f"{i:04X}: "
             
             # Hex данные
-            hex_part = ""
-            ascii_part = ""
-            
-            for j in range(16):
-                if i + j < len(self.data):
-                    byte = self.data[i + j]
-                    hex_part += f"{byte:02X} "
-                    if 32 <= byte <= 126:
-                        ascii_part += chr(byte)
-                    else:
-                        ascii_part += "."
-                else:
-                    hex_part += "   "
-                    ascii_part += " "
+            row = self.data[i:i+16]
+            hex_part = row.hex(' ').upper()
+            ascii_part = row.translate(_ASCII_LUT).decode('latin-1')
             
-            print(f"{addr}{hex_part:<48} |{ascii_part}|")
+            lines.append(f"{addr}{hex_part:<48} |{ascii_part:<16}|\n")
+        
+        sys.stdout.write(''.join(lines))
     
     def analyze_png(self):
         """Анализ структуры PNG файла"""
@@ -74,6 +97,7 @@ class HexAnalyzer:
         if signature == expected_sig:
             print("✓ Сигнатура PNG корректна")
             print(f"  Сигнатура: {signature.hex().upper()}")
+            print(f"  Версия zlib для проверки CRC: {zlib.ZLIB_RUNTIME_VERSION}")
         else:
             print("✗ Неверная сигнатура PNG")
             return
@@ -86,10 +110,10 @@ class HexAnalyzer:
             if offset + 12 > len(self.data):
                 break
                 
-            # Чтение заголовка чанка
-            length = struct.unpack('>I', self.data[offset:offset+4])[0]
+            # Чтение заголовка чанка (данные чанка - срез memoryview без копирования)
+            length = int.from_bytes(self.view[offset:offset+4], 'big')
             chunk_type = self.data[offset+4:offset+8]
-            chunk_data = self.data[offset+8:offset+8+length]
+            chunk_data = self.view[offset+8:offset+8+length]
             crc = self.data[offset+8+length:offset+12+length]
             
             chunk_count += 1
@@ -99,6 +123,13 @@ class HexAnalyzer:
             print(f"  Длина: {length} байт")
             print(f"  CRC: {crc.hex().upper()}")
             
+            # Проверка CRC (считается по типу и данным чанка)
+            computed_crc = zlib.crc32(chunk_data, zlib.crc32(chunk_type)).to_bytes(4, 'big')
+            if computed_crc == crc:
+                print("  ✓ CRC корректна")
+            else:
+                print(f"  ✗ Неверная CRC (ожидалось {computed_crc.hex().upper()})")
+            
             # Анализ конкретных чанков
             if chunk_type == b'IHDR':
                 self._analyze_ihdr_chunk(chunk_data)
@@ -116,8 +147,8 @@ class HexAnalyzer:
             print("  ✗ Неверная длина IHDR чанка")
             return
             
-        width = struct.unpack('>I', data[0:4])[0]
-        height = struct.unpack('>I', data[4:8])[0]
+        width = int.from_bytes(data[0:4], 'big')
+        height = int.from_bytes(data[4:8], 'big')
         bit_depth = data[8]
         color_type = data[9]
         compression = data[10]
@@ -138,14 +169,24 @@ class HexAnalyzer:
         print(f"  Размер сжатых данных: {len(data)} байт")
         
         try:
-            # Попытка распаковать данные
-            decompressed = zlib.decompress(data)
-            print(f"  Размер распакованных данных: {len(decompressed)} байт")
-            print(f"  Коэффициент сжатия: {len(decompressed)/len(data):.2f}")
+            # Попытка распаковать данные: сохраняем только первые 16 байт,
+            # остальное распаковываем порциями лишь для подсчета размера
+            decompressor = zlib.decompressobj()
+            head = decompressor.decompress(data, 16)
+            decompressed_size = len(head)
+            while decompressor.unconsumed_tail:
+                decompressed_size += len(decompressor.decompress(decompressor.unconsumed_tail, 65536))
+            decompressed_size += len(decompressor.flush())
+            
+            if not decompressor.eof:
+                raise zlib.error("incomplete or truncated stream")
+            
+            print(f"  Размер распакованных данных: {decompressed_size} байт")
+            print(f"  Коэффициент сжатия: {decompressed_size/len(data):.2f}")
             
             # Анализ первых байтов
-            if len(decompressed) > 0:
-                print(f"  Первые байты: {decompressed[:16].hex().upper()}")
+            if decompressed_size > 0:
+                print(f"  Первые байты: {head.hex().upper()}")
                 
         except Exception as e:
             print(f"  Ошибка распаковки: {e}")
@@ -166,26 +207,59 @@ class HexAnalyzer:
             print("✗ Неверная сигнатура JPEG")
             return
         
+        # Маркеры просматриваются последовательно - подсказываем ядру читать вперед
+        if isinstance(self.data, mmap.mmap) and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.data.madvise(mmap.MADV_SEQUENTIAL)
+        
         # Поиск маркеров
         offset = 2
         marker_count = 0
         
-        while offset < len(self.data) - 1:
-            if self.data[offset] == 0xFF:
-                marker = self.data[offset+1]
-                marker_count += 1
-                
-                marker_name = self._get_jpeg_marker_name(marker)
-                print(f"\nМаркер #{marker_count}: 0xFF{marker:02X} ({marker_name})")
+        while (pos := self.data.find(b'\xff', offset, len(self.data) - 1)) != -1:
+            marker = self.data[pos+1]
+            
+            # 0xFF00 - экранированный байт, 0xFFFF - заполнитель
+            if marker == 0x00 or marker == 0xFF:
+                offset = pos + 1
+                continue
+            
+            marker_count += 1
+            
+            marker_name = self._get_jpeg_marker_name(marker)
+            print(f"\nМаркер #{marker_count}: 0xFF{marker:02X} ({marker_name})")
+            
+            if marker == 0xD9:  # EOI
+                print("  Назначение: Конец изображения")
+                break
+            
+            # Маркеры без данных
+            if marker in _JPEG_STANDALONE_MARKERS:
+                offset = pos + 2
+                continue
+            
+            # Остальные сегменты начинаются с длины (включая сами 2 байта длины),
+            # поэтому содержимое сегмента можно пропустить целиком
+            if pos + 4 > len(self.data):
+                print("  ✗ Сегмент обрезан")
+                break
+            
+            segment_length = int.from_bytes(self.data[pos+2:pos+4], 'big')
+            print(f"  Длина сегмента: {segment_length} байт")
+            offset = pos + 2 + segment_length
+            
+            if marker == 0xDA:  # SOS
+                print("  Назначение: Начало сканирования")
                 
-                if marker == 0xD9:  # EOI
-                    print("  Назначение: Конец изображения")
-                    break
-                elif marker == 0xDA:  # SOS
-                    print("  Назначение: Начало сканирования")
+                # После заголовка SOS идут сжатые данные без длины: ищем следующий
+                # маркер, пропуская экранированные 0xFF00 и маркеры RST0-RST7
+                while (pos := self.data.find(b'\xff', offset, len(self.data) - 1)) != -1:
+                    next_byte = self.data[pos+1]
+                    if next_byte != 0x00 and not 0xD0 <= next_byte <= 0xD7:
+                        break
+                    offset = pos + 2
+                else:
                     break
-                    
-            offset += 1
+                offset = pos
     
     def _get_jpeg_marker_name(self, marker):
         """Получение названия JPEG маркера"""
@@ -217,10 +291,10 @@ class HexAnalyzer:
             return
         
         # Анализ заголовка файла
-        file_size = struct.unpack('<I', self.data[2:6])[0]
-        reserved1 = struct.unpack('<H', self.data[6:8])[0]
-        reserved2 = struct.unpack('<H', self.data[8:10])[0]
-        data_offset = struct.unpack('<I', self.data[10:14])[0]
+        file_size = int.from_bytes(self.data[2:6], 'little')
+        reserved1 = int.from_bytes(self.data[6:8], 'little')
+        reserved2 = int.from_bytes(self.data[8:10], 'little')
+        data_offset = int.from_bytes(self.data[10:14], 'little')
         
         print(f"\nЗаголовок файла BMP:")
         print(f"  Размер файла: {file_size} байт")
@@ -230,15 +304,34 @@ class HexAnalyzer:
         
         # Анализ заголовка изображения
         if len(self.data) >= 26:
-            header_size = struct.unpack('<I', self.data[14:18])[0]
-            width = struct.unpack('<I', self.data[18:22])[0]
-            height = struct.unpack('<I', self.data[22:26])[0]
+            header_size = int.from_bytes(self.data[14:18], 'little')
+            width = int.from_bytes(self.data[18:22], 'little')
+            height = int.from_bytes(self.data[22:26], 'little')
             
             print(f"\nЗаголовок изображения BMP:")
             print(f"  Размер заголовка: {header_size} байт")
             print(f"  Ширина: {width} пикселей")
             print(f"  Высота: {height} пикселей")
     
+    def analyze_entropy(self):
+        """Оценка энтропии файла по частотам байтов"""
+        if not self.data:
+            print("Файл не загружен!")
+            return
+        
+        print("\n=== ЭНТРОПИЯ БАЙТОВ ===")
+        
+        # Гистограмма байтов: np.bincount считает частоты в C без цикла Python
+        histogram = np.bincount(np.frombuffer(self.view, dtype=np.uint8), minlength=256)
+        probabilities = histogram[histogram > 0] / self.file_size
+        # Сумма p * log2(1/p) неотрицательна по построению (без -0.0 для одного значения байта)
+        entropy = float((probabilities * np.log2(1 / probabilities)).sum())
+        
+        print(f"  Различных значений байтов: {len(probabilities)} из 256")
+        print(f"  Энтропия: {entropy:.3f} бит/байт")
+        # Нижняя граница размера при побайтовом кодировании без учета контекста
+        print(f"  Оценка минимального размера: {entropy * self.file_size / 8:.0f} байт")
+    
     def analyze_file(self):
         """Основной метод анализа файла"""
         if not self.load_file():
@@ -258,6 +351,8 @@ class HexAnalyzer:
         else:
             print("Неизвестный формат файла")
         
+        self.analyze_entropy()
+        
         # Общий hex-дамп начала файла
         self.print_hex_dump(0, 128)
 
@@ -275,6 +370,7 @@ def main():
             filepath = os.path.join(test_dir, filename)
             analyzer = HexAnalyzer(filepath)
             analyzer.analyze_file()
+            analyzer.close()
             print("\n" + "="*80 + "\n")
     else:
         print("Папка test_images не найдена. Сначала запустите create_test_images.py")